@@ -1,4 +1,7 @@
 import argparse
+import concurrent.futures
+import contextlib
+import functools
 import logging
 import sys
 import textwrap
@@ -8,9 +11,10 @@ import tqdm
 from tqdm.contrib import DummyTqdmFile
 from tqdm.contrib.logging import logging_redirect_tqdm
 
+from glorpen.watching.cache import PageCache, get_default_cache_path
 from glorpen.watching.config import load_config
-from glorpen.watching.model import Card, DataLabels, PendingCard, DuplicatedEntryException
-from glorpen.watching.scrappers import NoScrapperAvailableException, ScrapperGuesser
+from glorpen.watching.model import Card, PendingCard, DuplicatedEntryException
+from glorpen.watching.scrappers import NoScrapperAvailableException, Scrapper, ScrapperGuesser, create_session
 from glorpen.watching.trello_db import DataFormatter, Database, VersionDetector
 
 console = logging.root.getChild("glorpen.watching.app")
@@ -22,7 +26,7 @@ def filter_cards(cards: typing.Iterable[Card], ns: argparse.Namespace):
             if card.title != ns.by_title and card.source_url != ns.by_url:
                 continue
         else:
-            if DataLabels.COMPLETED in card.labels:
+            if card.completed:
                 if not ns.completed:
                     continue
             else:
@@ -31,6 +35,10 @@ def filter_cards(cards: typing.Iterable[Card], ns: argparse.Namespace):
 
         yield card
 
+        # source urls are unique, no need to look further
+        if ns.by_url and not ns.by_title:
+            return
+
 
 def filter_pending_cards(cards: typing.Iterable[PendingCard], ns: argparse.Namespace,
                          scrapper_guesser: ScrapperGuesser):
@@ -47,6 +55,38 @@ def filter_pending_cards(cards: typing.Iterable[PendingCard], ns: argparse.Names
         yield pending_card, url, scrapper
 
 
+def scrape(items: typing.Iterable[tuple[typing.Any, str, Scrapper]], jobs: int):
+    def fetch(item: tuple[typing.Any, str, Scrapper]):
+        _, url, scrapper = item
+        console.debug(f"Checking {url}")
+        return item, scrapper.get(url)
+
+    # results are yielded as soon as they are scrapped, so saving a card overlaps with scraping others;
+    # saving itself stays sequential in caller thread
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures = [pool.submit(fetch, item) for item in items]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+    finally:
+        # on first error queued scrapes are dropped, only already running ones are waited for
+        pool.shutdown(cancel_futures=True)
+
+
+def is_duplicated_url(db: Database, pending_card: PendingCard, url: str):
+    if db.cards.has_source_url(url):
+        console.warning(f"Duplicated url, skipping {pending_card.name}")
+        return True
+    return False
+
+
+def positive_int(value: str):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected positive number, got {value}")
+    return number
+
+
 log_levels = [
     logging.DEBUG,
     logging.INFO,
@@ -56,15 +96,16 @@ log_levels = [
 ]
 
 
-def get_log_level(verbosity: int, quietness: int):
+@functools.cache
+def get_log_level(verbosity: int, quietness: int) -> int:
     return log_levels[max(min(2 - verbosity + quietness, len(log_levels) - 1), 0)]
 
 
-def main(args=None):
+def create_parser():
     p = argparse.ArgumentParser(
         description="Track your shows.", epilog=textwrap.dedent(
             """\
-                Available environment variables: .
+                Available environment variables: DEBUG_HTML (save pages that failed to scrape to temporary files).
                 
                 Config file is searched for in following order:
                   - config path provided in commandline
@@ -84,10 +125,17 @@ def main(args=None):
     p.add_argument("--by-title", metavar="TITLE", default=None, help="Process cards with given title")
     p.add_argument("--by-url", metavar="URL", default=None, help="Process card with given source url")
     p.add_argument("--config", metavar="PATH", default=None, help="Path to config file")
+    p.add_argument("--cache", metavar="PATH", default=None, help="Path to scrapped pages cache")
+    p.add_argument("--no-cache", action="store_true", default=False, help="Do not use scrapped pages cache")
+    p.add_argument("-j", "--jobs", metavar="N", type=positive_int, default=4,
+                   help="Number of concurrent scrapes")
     p.add_argument("-v", "--verbose", action="count", default=0, help="Increase verbosity")
     p.add_argument("-q", "--quiet", action="count", default=0, help="Decrease verbosity")
+    return p
 
-    ns = p.parse_args(args)
+
+def main(args=None):
+    ns = create_parser().parse_args(args)
 
     if not console.handlers:
         handler = logging.StreamHandler(DummyTqdmFile(sys.stdout))
@@ -102,7 +150,6 @@ def main(args=None):
         logging.root.setLevel(log_level)
 
     config = load_config(ns.config)
-    scrapper_guesser = ScrapperGuesser()
 
     db = Database(
         config.app_key, config.app_secret,
@@ -120,30 +167,44 @@ def main(args=None):
         console.info("Provisioning board")
         db.setup()
 
-    with logging_redirect_tqdm():
+    if ns.no_cache:
+        cache_context = contextlib.nullcontext()
+    else:
+        cache_context = contextlib.closing(PageCache(ns.cache or get_default_cache_path()))
+
+    with contextlib.closing(create_session(pool_maxsize=ns.jobs)) as session, cache_context as cache, \
+            logging_redirect_tqdm():
+        # all scrappers share one connection pool, so keep-alive connections are reused between cards
+        scrapper_guesser = ScrapperGuesser(session, cache)
+
         if ns.ongoing or ns.completed or ns.by_title or ns.by_url:
-            cards = list(filter_cards(db.cards, ns))
+            cards = [
+                (card, card.source_url, scrapper_guesser.get_for_url(card.source_url))
+                for card in filter_cards(db.cards, ns)
+            ]
             if cards:
-                for card in tqdm.tqdm(cards):
-                    console.info(f"Checking {card.title} / {card.id}")
-                    scrapper = scrapper_guesser.get_for_url(card.source_url)
-                    data = scrapper.get(card.source_url)
+                for (card, _, _), data in tqdm.tqdm(scrape(cards, ns.jobs), total=len(cards)):
                     db.save(card, data)
+                console.info(f"Checked {len(cards)} cards")
 
         if ns.pending or ns.by_url:
-            cards = list(filter_pending_cards(db.cards.get_pending(), ns, scrapper_guesser))
+            cards = [
+                (pending_card, url, scrapper)
+                for pending_card, url, scrapper in filter_pending_cards(db.cards.get_pending(), ns, scrapper_guesser)
+                if not is_duplicated_url(db, pending_card, url)
+            ]
             if cards:
-                for pending_card, url, scrapper in tqdm.tqdm(cards):
-                    if db.cards.has_source_url(url):
-                        console.warning(f"Duplicated url, skipping {pending_card.name}")
+                for (pending_card, url, _), data in tqdm.tqdm(scrape(cards, ns.jobs), total=len(cards)):
+                    # other pending card could add the same url in meantime
+                    if is_duplicated_url(db, pending_card, url):
                         continue
 
-                    data = scrapper.get(url)
                     try:
                         db.save_pending(pending_card, data)
                     except DuplicatedEntryException:
                         console.warning(f"Tried to add duplicated card, removing pending {pending_card.name} / {data.titles[0]}")
                         db.delete_pending(pending_card)
+                console.info(f"Checked {len(cards)} pending cards")
 
 
 if __name__ == "__main__":
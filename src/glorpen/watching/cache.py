@@ -0,0 +1,77 @@
+import dataclasses
+import os
+import pathlib
+import pickle
+import sqlite3
+import threading
+import time
+import typing
+
+
+def get_default_cache_path():
+    return pathlib.Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")) / "gwatching" / "pages.sqlite"
+
+
+@dataclasses.dataclass
+class CachedPage:
+    # raw response, scrapped data is always built from it so subrequests made by scrappers are not skipped
+    content: typing.Any
+    etag: typing.Optional[str] = None
+    last_modified: typing.Optional[str] = None
+    stored_at: typing.Optional[float] = None
+
+    def is_fresh(self, max_age: float):
+        return self.stored_at is not None and time.time() - self.stored_at < max_age
+
+    def get_conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    def __init__(self, path: os.PathLike):
+        super(PageCache, self).__init__()
+
+        path = pathlib.Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # scrappers run in worker threads, connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, page BLOB NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS covers (url TEXT PRIMARY KEY, content BLOB NOT NULL)")
+
+    def get(self, url: str) -> typing.Optional[CachedPage]:
+        with self._lock:
+            row = self._db.execute("SELECT page FROM responses WHERE url = ?", (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            return pickle.loads(row[0])
+        except (pickle.UnpicklingError, AttributeError, TypeError, ValueError, EOFError):
+            # stored by incompatible version, will be replaced on next save
+            return None
+
+    def set(self, url: str, page: CachedPage):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, page) VALUES (?, ?)", (url, pickle.dumps(page))
+            )
+
+    def get_cover(self, url: str) -> typing.Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT content FROM covers WHERE url = ?", (url,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_cover(self, url: str, content: bytes):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO covers (url, content) VALUES (?, ?)", (url, content))
+
+    def close(self):
+        self._db.close()
@@ -1,12 +1,10 @@
 import argparse
-import itertools
 import logging
 import os
 import textwrap
 import time
 
 import more_itertools
-import pyparsing
 import schedule
 
 from glorpen.watching import app
@@ -26,21 +24,6 @@ time_units = tuple(
     more_itertools.flatten((range, f"{range}s") for range in ("hour", "day", "week", "minute", "second"))
 )
 
-specific_time = pyparsing.Literal("at") + pyparsing.Regex(r':?\d+(:\d+)*')
-
-command = pyparsing.Literal(
-    "do"
-) + pyparsing.OneOrMore(
-    pyparsing.Or(
-        [pyparsing.Regex(r"-[vq]+")] + [pyparsing.Literal(f"--{option}") for option in
-                                        ("pending", "completed", "setup", "ongoing", "verbose", "quiet", "config")]
-    )
-)
-
-grammar = pyparsing.Literal("every") + pyparsing.Optional(
-    pyparsing.Or(itertools.chain([pyparsing.Word(pyparsing.nums)], map(pyparsing.Literal, weekdays))), default=1
-) + pyparsing.Or(map(pyparsing.Literal, time_units)) + pyparsing.Optional(specific_time) + command
-
 
 def run_job(name, args):
     console.info(f"Starting job {name}")
@@ -49,27 +32,52 @@ def run_job(name, args):
 
 
 def schedule_job(name: str, config_line: str):
-    tokens = list(reversed(grammar.parse_string(config_line, parse_all=True)))
-    job: schedule.Job
-
-    assert tokens.pop() == "every"
-
-    token = tokens.pop()
-    if token in weekdays:
-        job = getattr(schedule.every(), token)
-    else:
-        interval = int(token)
-        token = tokens.pop()
-        assert token in time_units
-        job = getattr(schedule.every(interval), token)
-
-    token = tokens.pop()
-    if token == "at":
-        job = job.at(tokens.pop())
-        token = tokens.pop()
-
-    assert token == "do"
-    job.do(run_job, name=name, args=tokens)
+    tokens = config_line.split()
+    index = 0
+
+    def peek():
+        return tokens[index] if index < len(tokens) else None
+
+    def take(*expected: str):
+        nonlocal index
+        if index >= len(tokens):
+            raise ValueError(f"Unexpected end of JOB_{name} after token {index}: {config_line!r}")
+        if expected and tokens[index] not in expected:
+            raise ValueError(
+                f"Unexpected {tokens[index]!r} in JOB_{name} at token {index + 1}, "
+                f"expected one of {', '.join(expected)}: {config_line!r}"
+            )
+        index += 1
+        return tokens[index - 1]
+
+    take("every")
+
+    try:
+        if peek() in weekdays:
+            job = getattr(schedule.every(), take())
+        else:
+            interval = 1
+            if (peek() or "").isdigit():
+                interval = int(take())
+            job = getattr(schedule.every(interval), take(*time_units))
+
+        if peek() == "at":
+            take()
+            job = job.at(take())
+    except schedule.ScheduleError as e:
+        raise ValueError(f"Invalid schedule in JOB_{name}: {e}: {config_line!r}") from e
+
+    take("do")
+    args = tokens[index:]
+    if not args:
+        raise ValueError(f"Missing command in JOB_{name}: {config_line!r}")
+    # argparse exits on bad arguments, which would stop scheduler loop when job runs
+    try:
+        app.create_parser().parse_args(args)
+    except SystemExit as e:
+        raise ValueError(f"Invalid command in JOB_{name}: {config_line!r}") from e
+
+    job.do(run_job, name=name, args=args)
 
     console.info(f"Registered {name} to run on {job.next_run}")
 
@@ -105,5 +113,11 @@ if __name__ == "__main__":
             schedule_job(k[4:], v)
 
     while True:
+        # sleep until next job is due instead of polling every second
+        idle_seconds = schedule.idle_seconds()
+        if idle_seconds is None:
+            console.warning("No jobs scheduled, exiting")
+            break
+        if idle_seconds > 0:
+            time.sleep(min(idle_seconds, 3600))
         schedule.run_pending()
-        time.sleep(1)
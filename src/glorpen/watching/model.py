@@ -7,7 +7,7 @@ class DuplicatedEntryException(ValueError):
     pass
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Date:
     year: int
     month: typing.Optional[int] = None
@@ -23,7 +23,7 @@ class Date:
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True, eq=False)
 class Label:
     id: typing.Optional[str]
     name: str
@@ -33,20 +33,28 @@ class Label:
         return hash(self.id)
 
     def __eq__(self, other: 'Label'):
+        if self is other:
+            return True
+        if not isinstance(other, Label):
+            return NotImplemented
         return self.id == other.id
 
 
-class DataLabels(enum.Enum):
-    BOOKS = "books"
-    ANIME = "anime"
-    SERIES = "series"
-    MOVIE = "movie"
-    CARTOON = "cartoon"
-    MANGA = "manga"
-    COMPLETED = "completed"
+class DataLabels(enum.Flag):
+    BOOKS = enum.auto()
+    ANIME = enum.auto()
+    SERIES = enum.auto()
+    MOVIE = enum.auto()
+    CARTOON = enum.auto()
+    MANGA = enum.auto()
+    COMPLETED = enum.auto()
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ListItem:
     number: int | None
     id: typing.Optional[str] = None
@@ -57,7 +65,7 @@ class ListItem:
         return f"<ListItem: {self.number},{self.name},{self.date}>"
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class List:
     name: str
     items: typing.Sequence[ListItem] = dataclasses.field(default_factory=list)
@@ -67,21 +75,21 @@ class List:
         return f"<List: {self.name}>"
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ParsedRawDescription:
     alt_titles: typing.Sequence[str]
     source_url: str
     description: typing.Optional[str]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Card:
     title: str
     source_url: str
     version: str
     alt_titles: typing.Sequence[str] = dataclasses.field(default_factory=list)
     description: typing.Optional[str] = None
-    labels: set[DataLabels] = dataclasses.field(default_factory=set)
+    labels: DataLabels = DataLabels(0)
     tags: typing.Set[Label] = dataclasses.field(default_factory=set)
     lists: typing.Sequence[List] = dataclasses.field(default_factory=list)
     cover_id: typing.Optional[str] = None
@@ -89,23 +97,23 @@ class Card:
 
     @property
     def completed(self):
-        return DataLabels.COMPLETED in self.labels
+        return bool(self.labels & DataLabels.COMPLETED)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class PendingCard:
     id: typing.Optional[str]
     name: str
     description: typing.Optional[str]
-    labels: set[DataLabels]
+    labels: DataLabels
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ScrappedData:
     titles: typing.Sequence[str]
     url: str
     tags: typing.Set[str]
-    labels: typing.Set[DataLabels]
+    labels: DataLabels
     parts: typing.Sequence[List]
     cover: typing.Optional[bytes] = None
     description: typing.Optional[str] = None
@@ -1,4 +1,5 @@
 import abc
+import concurrent.futures
 import dataclasses
 import enum
 import functools
@@ -6,51 +7,119 @@ import html
 import itertools
 import json
 import logging
+import os
 import re
+import tempfile
 import textwrap
+import threading
 import time
 import typing
 import urllib.parse
-from collections import OrderedDict
+from collections import defaultdict
 from datetime import datetime
 
 import requests
 import user_agent
-from lxml.html import HtmlElement, fromstring
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.util import Retry
+from lxml.etree import XPath
+from lxml.html import HTMLParser, HtmlElement, fromstring, tostring
 
+from glorpen.watching.cache import CachedPage, PageCache
 from glorpen.watching.model import DataLabels, Date, List, ListItem, PendingCard, ScrappedData
 
 logger = logging.root.getChild(__name__)
 
-sre_http = r'(?:(?:https?|ftp):\/\/)(?:\S+(?::\S*)?@)?(?:(?!(?:10|127)(?:\.\d{1,3}){3})(?!(?:169\.254|192\.168)(?:\.\d{1,3}){2})(?!172\.(?:1[6-9]|2\d|3[0-1])(?:\.\d{1,3}){2})(?:[1-9]\d?|1\d\d|2[01]\d|22[0-3])(?:\.(?:1?\d{1,2}|2[0-4]\d|25[0-5])){2}(?:\.(?:[1-9]\d?|1\d\d|2[0-4]\d|25[0-4]))|(?:(?:[a-z\u00a1-\uffff0-9]-*)*[a-z\u00a1-\uffff0-9]+)(?:\.(?:[a-z\u00a1-\uffff0-9]-*)*[a-z\u00a1-\uffff0-9]+)*(?:\.(?:[a-z\u00a1-\uffff]{2,}))\.?)(?::\d{2,5})?(?:[/?#]\S*)?'
+# downloads that can run alongside parsing, eg. covers
+background_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="scrapper")
 
+# host is validated by is_public_host, so pattern has no lookarounds or nested quantifiers to backtrack on
+sre_http = r'(?:https?|ftp)://(?:[^\s/?#@]+@)?(?P<host>[a-z\u00a1-\uffff0-9.-]+)(?::\d{2,5})?(?:[/?#]\S*)?'
+re_ipv4 = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
+re_host_label = re.compile(r'[a-z\u00a1-\uffff0-9]+(?:-+[a-z\u00a1-\uffff0-9]+)*')
+re_host_tld = re.compile(r'[a-z\u00a1-\uffff]{2,}')
 
-def get_unique_list(iter):
-    seen = set()
-    return [x for x in iter if not (x in seen or seen.add(x))]
+
+def is_public_host(host: str) -> bool:
+    if re_ipv4.fullmatch(host):
+        octets = [int(i) for i in host.split(".")]
+        if octets[0] in (10, 127) or octets[:2] in ([169, 254], [192, 168]) or (
+                octets[0] == 172 and 16 <= octets[1] <= 31):
+            return False
+        return 1 <= octets[0] <= 223 and octets[1] <= 255 and octets[2] <= 255 and 1 <= octets[3] <= 254
+
+    *labels, tld = host.removesuffix(".").split(".")
+    return bool(labels) and bool(re_host_tld.fullmatch(tld)) and all(map(re_host_label.fullmatch, labels))
+
+
+@functools.cache
+def get_user_agent() -> str:
+    return user_agent.generate_user_agent()
+
+
+def create_session(pool_maxsize: int = DEFAULT_POOLSIZE) -> requests.Session:
+    session = requests.Session()
+    # transient errors and rate limits are retried with backoff, final error response is returned to caller
+    retry = Retry(
+        total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "POST"), raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_maxsize=max(pool_maxsize, DEFAULT_POOLSIZE), max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {'User-Agent': get_user_agent()}
+    )
+    return session
+
+
+def get_unique_list[T](iter: typing.Iterable[T]) -> list[T]:
+    return list(dict.fromkeys(iter))
 
 
 class Scrapper[S](abc.ABC):
+    headers: dict[str, str] = {}
 
-    def __init__(self):
+    def __init__(self, session: typing.Optional[requests.Session] = None, cache: typing.Optional[PageCache] = None):
         super(Scrapper, self).__init__()
         self.logger = logging.root.getChild(self.__class__.__name__)
-        self.session = requests.Session()
-        self.session.headers.update(
-            {'User-Agent': user_agent.generate_user_agent()}
-        )
+        self.session = create_session() if session is None else session
+        self.cache = cache
 
     def get(self, url: str):
-        content = self.fetch_page(url)
+        return self._get_info(self.fetch_page(url))
+
+    def _get_info(self, content: S) -> ScrappedData:
         try:
             data = self.get_info(content)
         except Exception as e:
             self.logger.exception(e)
-            # with open("out.html", "wb") as f:
-            #     f.write(tostring(content))
+            if os.environ.get("DEBUG_HTML"):
+                self.dump_content(content)
             raise e
         return data
 
+    def dump_content(self, content: S):
+        pass
+
+    def fetch_cover(self, url: typing.Optional[str]) -> concurrent.futures.Future:
+        if not url:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+
+        return background_executor.submit(self._download_cover, url)
+
+    def _download_cover(self, url: str) -> bytes:
+        # cover urls are unique per image, so once downloaded they are reused between runs
+        content = None if self.cache is None else self.cache.get_cover(url)
+        if content is None:
+            response = self.session.get(url, headers=self.headers)
+            content = response.content
+            if self.cache is not None and response.ok:
+                self.cache.set_cover(url, content)
+        return content
+
     @abc.abstractmethod
     def supports_url(self, url) -> bool:
         raise NotImplementedError()
@@ -65,57 +134,97 @@ class Scrapper[S](abc.ABC):
 
 
 class HtmlScrapper(Scrapper[HtmlElement], abc.ABC):
-    def fetch_page(self, url, params=None) -> HtmlElement:
-        s = self.session.get(url, params=params or {})
+    def get(self, url: str):
+        if self.cache is None:
+            return super(HtmlScrapper, self).get(url)
+
+        cached = self.cache.get(url)
+        response = self.fetch_response(url, headers=cached.get_conditional_headers() if cached else None)
+        if cached and response.status_code == 304:
+            # only page download is skipped, episodes, tags and dates are still checked by get_info
+            self.logger.debug(f"Not modified since last scrape: {url}")
+            return self._get_info(self.parse_content(cached.content))
+
+        data = self._get_info(self.parse_response(response))
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.set(url, CachedPage(content=response.content, etag=etag, last_modified=last_modified))
+
+        return data
+
+    def fetch_response(self, url, params=None, headers=None) -> requests.Response:
+        s = self.session.get(url, params=params or {}, headers={**self.headers, **(headers or {})})
         s.raise_for_status()
-        return fromstring(s.content.decode())
+        return s
 
+    def dump_content(self, content: HtmlElement):
+        # serialized only when asked for, failing page is kept for inspection
+        fd, path = tempfile.mkstemp(prefix="gwatching-", suffix=".html")
+        with os.fdopen(fd, "wb") as f:
+            f.write(tostring(content, method="html"))
+        self.logger.error(f"Failing page was saved to {path}")
 
-def limit(max_requests_per_second: float):
-    def inner(f: typing.Callable):
-        @functools.wraps(f)
-        def wrapper(*args, **kwargs):
-            now = time.time()
-            if wrapper.last_request_time is not None:
-                diff_seconds = (now - wrapper.last_request_time)
-                seconds_to_wait = 1.0 / max_requests_per_second - diff_seconds
-                if seconds_to_wait > 0:
-                    logger.info(f"sleeping for {seconds_to_wait}")
-                    time.sleep(seconds_to_wait)
-
-            wrapper.last_request_time = now
-            return f(*args, **kwargs)
+    @classmethod
+    def parse_content(cls, content: bytes) -> HtmlElement:
+        # bytes are decoded by libxml2 itself, parsers are not shared between scrapping threads
+        return fromstring(content, parser=HTMLParser(encoding="utf-8", remove_comments=True, collect_ids=False))
 
-        wrapper.last_request_time: typing.Optional[float] = time.time()
+    @classmethod
+    def parse_response(cls, response: requests.Response) -> HtmlElement:
+        return cls.parse_content(response.content)
 
-        return wrapper
+    def fetch_page(self, url, params=None) -> HtmlElement:
+        return self.parse_response(self.fetch_response(url, params=params))
 
-    return inner
 
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1):
+        super(TokenBucket, self).__init__()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # scrapes can run concurrently, so waiting for a token is serialized
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens < 1:
+                seconds_to_wait = (1 - self.tokens) / self.rate
+                logger.info(f"sleeping for {seconds_to_wait}")
+                time.sleep(seconds_to_wait)
+                self.tokens = 1
+                self.updated_at = time.monotonic()
+
+            self.tokens -= 1
 
-def http_retry(max_tries: int, codes=(500,)):
+
+def limit(max_requests_per_second: float, burst: int = 1):
     def inner(f: typing.Callable):
+        bucket = TokenBucket(rate=max_requests_per_second, capacity=burst)
+
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
-            last_error = None
-            for try_number in range(1, max_tries + 1):
-                logger.debug(f"try {try_number} of {max_tries}")
-                try:
-                    return f(*args, **kwargs)
-                except requests.exceptions.HTTPError as e:
-                    response: requests.Response = e.response
-                    last_error = e
-                    if response.status_code not in codes:
-                        raise e
-            raise last_error
+            bucket.acquire()
+            return f(*args, **kwargs)
 
         return wrapper
 
     return inner
 
 
-def remove_tags(text: str):
-    return ''.join(fromstring(text).itertext())
+re_html_tag = re.compile(r'<[^>]+>')
+
+
+def remove_tags(text: str) -> str:
+    # descriptions are short fragments with simple formatting tags, no need to build a document
+    return html.unescape(re_html_tag.sub('', text))
 
 
 class AniListFormat(enum.Enum):
@@ -131,22 +240,24 @@ class AniListFormat(enum.Enum):
     ONE_SHOT = "ONE_SHOT"
 
     @classmethod
+    @functools.cache
     def manga(cls):
-        return {
+        return frozenset({
             cls.MANGA,
             cls.ONE_SHOT
-        }
+        })
 
     @classmethod
+    @functools.cache
     def anime(cls):
-        return {
+        return frozenset({
             cls.TV,
             cls.TV_SHORT,
             cls.MOVIE,
             cls.SPECIAL,
             cls.OVA,
             cls.ONA,
-        }
+        })
 
 
 class AniListType(enum.Enum):
@@ -165,74 +276,111 @@ class AniListStatus(enum.Enum):
 class AniList(Scrapper[dict]):
     re_host = re.compile(r'^https?://anilist.co/[a-z]+/[0-9]+.*')
     max_requests_per_second = 15 / 60
-
-    def get_query(self, anilist_id: int):
-        query = textwrap.dedent(f"""\
-        query ($id: Int) {{
-            Media (id: $id) {{
-                title {{
-                    romaji
-                    english
-                    native
-                }}
-                status
-                episodes
-                type
-                genres
-                tags {{
-                    name
-                }}
-                coverImage {{
-                    extraLarge
-                }}
-                chapters
-                volumes
-                siteUrl
-                description
-            }}
-        }}
-        """)
-
-        return {
-            "query": query,
-            "variables": {
-                "id": anilist_id
-            }
+    # idle time is credited, so few queries after a pause are not delayed
+    max_burst_requests = 3
+    # media from concurrent scrapes are fetched together with aliased queries
+    max_batch_size = 10
+    # GraphQL responses have no validators, so cached data is reused for some time to save rate limit
+    cache_max_age = 24 * 60 * 60
+
+    media_fields = textwrap.dedent("""\
+        title {
+            romaji
+            english
+            native
         }
+        status
+        episodes
+        type
+        genres
+        tags {
+            name
+        }
+        coverImage {
+            extraLarge
+        }
+        chapters
+        volumes
+        siteUrl
+        description
+        """)
 
-    def get_title_query(self, title: str, type: AniListType, format: typing.Collection[AniListFormat]):
-        query = textwrap.dedent(f"""\
-        query ($title: String, $type: MediaType, $format: [MediaFormat]) {{
-            Page (perPage: 10) {{
-                media (search: $title, type: $type, format_in: $format) {{
+    title_query = textwrap.dedent("""\
+        query ($title: String, $type: MediaType, $format: [MediaFormat]) {
+            Page (perPage: 10) {
+                media (search: $title, type: $type, format_in: $format) {
                     id
-                    title {{
+                    title {
                         romaji
                         english
                         native
-                    }}
-                }}
-            }}
-        }}
+                    }
+                }
+            }
+        }
         """)
 
+    def __init__(self, *args, **kwargs):
+        super(AniList, self).__init__(*args, **kwargs)
+        self._pending_lock = threading.Lock()
+        self._pending: list[tuple[int, concurrent.futures.Future]] = []
+        self._is_fetching = False
+
+    # queries only differ by batch size, variables change between requests
+    @classmethod
+    @functools.cache
+    def get_media_query(cls, count: int):
+        variables = ", ".join(f"$id{i}: Int" for i in range(count))
+        fields = textwrap.indent(cls.media_fields, " " * 8)
+        media = "".join(f"    m{i}: Media (id: $id{i}) {{\n{fields}    }}\n" for i in range(count))
+        return f"query ({variables}) {{\n{media}}}\n"
+
+    def get_query(self, anilist_ids: typing.Sequence[int]):
         return {
-            "query": query,
+            "query": self.get_media_query(len(anilist_ids)),
+            "variables": {f"id{i}": anilist_id for i, anilist_id in enumerate(anilist_ids)}
+        }
+
+    def get_title_query(self, title: str, type: AniListType, format: typing.Collection[AniListFormat]):
+        return {
+            "query": self.title_query,
             "variables": {
                 "title": title,
                 "type": type.value,
-                "format": list(f.value for f in format)
+                "format": [f.value for f in format]
             }
         }
 
     def supports_url(self, url):
         return bool(self.re_host.match(url)) or "anime-planet" in url
 
-    _re_remove = re.compile(r'[^a-z0-9 ]+')
-    _re_replace = re.compile(r'[:-]+')
-    _re_fold_whitespace = re.compile(r'\s+')
+    # ":" and "-" become spaces, other ascii characters than lowercase letters, digits and space are removed
+    _title_translation = str.maketrans(
+        {c: " " if c in ":-" else None for c in map(chr, range(128)) if not (c.islower() or c.isdigit() or c == " ")}
+    )
+
+    @classmethod
+    def _normalize_title(cls, title: str) -> str:
+        # non-ascii characters are dropped by encoding
+        title = title.lower().translate(cls._title_translation).encode("ascii", "ignore").decode()
+        return " ".join(title.split())
+
+    def get(self, url: str):
+        if self.cache is None:
+            return super(AniList, self).get(url)
+
+        cached = self.cache.get(url)
+        if cached and cached.is_fresh(self.cache_max_age):
+            self.logger.debug(f"Using recently fetched media for {url}")
+            return self._get_info(cached.content)
+
+        # api response is cached instead of scrapped data, cover bytes are kept only in covers cache
+        media = self.fetch_page(url)
+        data = self._get_info(media)
+        self.cache.set(url, CachedPage(content=media, stored_at=time.time()))
+        return data
 
-    def get_id_from_anime_planet_url(self, url: str):
+    def get_id_from_anime_planet_url(self, url: str) -> int:
         title = urllib.parse.unquote(url.split("/")[-1]).replace("-", " ")
         is_manga = "/manga/" in url
         query = self.get_title_query(
@@ -241,81 +389,130 @@ class AniList(Scrapper[dict]):
             format=AniListFormat.manga() if is_manga else AniListFormat.anime(),
         )
 
-        s = self.session.post("https://graphql.anilist.co/", json=query)
-        s.raise_for_status()
-        for info in s.json()["data"]["Page"]["media"]:
+        titles = {title, title.replace(" ", '')}
+
+        for info in self.post_query(query)["Page"]["media"]:
             names = set()
             for api_title in info["title"].values():
                 if not api_title:
                     continue
-                api_title = self._re_replace.sub(' ', api_title.lower())
-                api_title = self._re_remove.sub('', api_title)
-                api_title = self._re_fold_whitespace.sub(' ', api_title).strip()
+                api_title = self._normalize_title(api_title)
                 if api_title:
                     names.add(api_title)
                     names.add(api_title.replace(" ", ''))
 
-            if title in names or title.replace(" ", '') in names:
+            if not titles.isdisjoint(names):
                 return info["id"]
 
         raise Exception(f"AniList id was not found for {url}")
 
-    @http_retry(3)
-    @limit(max_requests_per_second=max_requests_per_second)
+    @limit(max_requests_per_second=max_requests_per_second, burst=max_burst_requests)
+    def post_query(self, query: dict, partial: bool = False) -> dict:
+        s = self.session.post("https://graphql.anilist.co/", json=query)
+        if partial and not s.ok:
+            # failed aliases are null, data for the rest is still returned
+            try:
+                data = json.loads(s.content).get("data")
+            except (ValueError, AttributeError):
+                data = None
+            if data:
+                return data
+        s.raise_for_status()
+        return json.loads(s.content)["data"]
+
+    def fetch_media(self, anilist_ids: typing.Sequence[int]) -> list[typing.Optional[dict]]:
+        data = self.post_query(self.get_query(anilist_ids), partial=len(anilist_ids) > 1)
+        return [data.get(f"m{i}") for i in range(len(anilist_ids))]
+
     def fetch_page(self, url, params=None) -> dict:
         if "anime-planet" in url:
             anilist_id = self.get_id_from_anime_planet_url(url)
         else:
             anilist_id = int(url.split("/")[4])
 
-        query = self.get_query(anilist_id)
-        s = self.session.post("https://graphql.anilist.co/", json=query)
-        s.raise_for_status()
-        return s.json()["data"]["Media"]
+        future = concurrent.futures.Future()
+        with self._pending_lock:
+            self._pending.append((anilist_id, future))
+            is_fetching = self._is_fetching
+            self._is_fetching = True
+
+        # first waiting thread fetches media for everyone, ids queued while it waits for rate limit go into next batch
+        if not is_fetching:
+            self._fetch_pending()
+
+        return future.result()
+
+    def _fetch_pending(self):
+        batch = []
+        try:
+            while True:
+                with self._pending_lock:
+                    if not self._pending:
+                        self._is_fetching = False
+                        return
+                    batch = self._pending[:self.max_batch_size]
+                    del self._pending[:self.max_batch_size]
+
+                self._fetch_batch(batch)
+        except BaseException as e:
+            # threads waiting for their media would block forever
+            with self._pending_lock:
+                outstanding = batch + self._pending
+                self._pending = []
+                self._is_fetching = False
+            for _, future in outstanding:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+    def _fetch_batch(self, batch: list[tuple[int, concurrent.futures.Future]]):
+        try:
+            medias = self.fetch_media([anilist_id for anilist_id, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (anilist_id, future), media in zip(batch, medias):
+            if media is not None:
+                future.set_result(media)
+            elif len(batch) > 1:
+                # refetched alone, so error for missing media is reported
+                self._fetch_batch([(anilist_id, future)])
+            else:
+                future.set_exception(LookupError(f"AniList media {anilist_id} not found"))
 
     def get_info(self, doc: dict):
         cover_url = doc["coverImage"]["extraLarge"]
         description = remove_tags(doc["description"])
 
-        tags = set(g.lower() for g in doc["genres"])
+        tags = {g.lower() for g in doc["genres"]}
         tags.update(g["name"].lower() for g in doc["tags"])
 
-        if cover_url:
-            cover_data = self.session.get(cover_url).content
-        else:
-            cover_data = None
+        cover_future = self.fetch_cover(cover_url)
 
-        title_sort = ["english", "romaji", "native"]
-        names = list(map(lambda x: x[1], sorted(doc["title"].items(), key=lambda x: title_sort.index(x[0]))))
+        names = [title for key in ("english", "romaji", "native") if (title := doc["title"].get(key))]
 
         url = doc["siteUrl"]
 
-        labels = set()
-
-        entry_type = AniListType(doc["type"])
-        if entry_type is AniListType.MANGA:
-            labels.add(DataLabels.MANGA)
-            if AniListStatus.FINISHED.value in doc["status"]:
-                labels.add(DataLabels.COMPLETED)
-        else:
-            labels.add(DataLabels.ANIME)
-            if AniListStatus.FINISHED.value in doc["status"]:
-                labels.add(DataLabels.COMPLETED)
+        labels = DataLabels.MANGA if AniListType(doc["type"]) is AniListType.MANGA else DataLabels.ANIME
+        if doc["status"] == AniListStatus.FINISHED.value:
+            labels |= DataLabels.COMPLETED
 
         if doc["chapters"] is not None:
             parts = [List(
                 name="Chapters",
-                items=list(ListItem(number=e + 1) for e in range(0, doc["chapters"]))
+                items=[ListItem(number=number) for number in range(1, doc["chapters"] + 1)]
             )]
         elif doc["episodes"] is not None:
             parts = [List(
                 name="Episodes",
-                items=list(ListItem(number=e + 1) for e in range(0, doc["episodes"]))
+                items=[ListItem(number=number) for number in range(1, doc["episodes"] + 1)]
             )]
         elif doc["volumes"] is not None:
             parts = [List(
                 name="Volumes",
-                items=list(ListItem(number=e + 1) for e in range(0, doc["volumes"]))
+                items=[ListItem(number=number) for number in range(1, doc["volumes"] + 1)]
             )]
         else:
             parts = []
@@ -323,7 +520,7 @@ class AniList(Scrapper[dict]):
         return ScrappedData(
             url=url,
             titles=names,
-            cover=cover_data,
+            cover=cover_future.result(),
             description=description,
             labels=labels,
             tags=tags,
@@ -331,7 +528,7 @@ class AniList(Scrapper[dict]):
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ImdbEpisode:
     season: str
     episode: str
@@ -342,40 +539,34 @@ class ImdbEpisode:
 class Imdb(HtmlScrapper):
     host = "www.imdb.com"
     re_tid = re.compile('^.*/title/(tt[0-9]+).*$')
-    re_url = re.compile('^https?://' + host + '/')
-
-    def __init__(self):
-        super(Imdb, self).__init__()
-        self.session.headers.update(
-            {
-                "Accept-Language": "en-US,en;q=0.5"
-            }
-        )
+    url_prefixes = (f"https://{host}/", f"http://{host}/")
+
+    # only first match is used by most lookups, strings are returned without references back to the tree
+    xp_script = XPath('(//script[@type=$type])[1]')
+    xp_script_with_id = XPath('(//script[@type=$type and @id=$id])[1]')
+    xp_cover = XPath(
+        '(//meta[@property="og:image" and string(@content) and not(contains(@content, "imdb/images/logos"))]/@content)[1]',
+        smart_strings=False
+    )
+    xp_plot = XPath('//span[@data-testid="plot-xl"]/text()', smart_strings=False)
+
+    headers = {
+        "Accept-Language": "en-US,en;q=0.5"
+    }
 
     def supports_url(self, url):
-        return bool(self.re_url.match(url))
-
-    @http_retry(3)
-    def fetch_page(self, url, params=None) -> HtmlElement:
-        return super(Imdb, self).fetch_page(url, params=params)
+        return url.startswith(self.url_prefixes)
 
     @classmethod
     def _get_last_episode_year(cls, episodes: typing.Iterable[List]):
-        max_year = 0
-        for season in episodes:
-            for episode in season.items:
-                if episode.date:
-                    max_year = max(episode.date.year, max_year)
-        return max_year
+        return max((episode.date.year for season in episodes for episode in season.items if episode.date), default=0)
 
     def parse_doc_data(self, doc: HtmlElement, type: str = "application/json", id: str = None) -> dict:
-        # with open("out.html", "wb") as f:
-        #     f.write(tostring(doc))
         if id is None:
-            q = f'//script[@type="{type}"]'
+            scripts = self.xp_script(doc, type=type)
         else:
-            q = f'//script[@type="{type}" and @id="{id}"]'
-        return json.loads(doc.xpath(q)[0].text)
+            scripts = self.xp_script_with_id(doc, type=type, id=id)
+        return json.loads(scripts[0].text)
 
     def get_info(self, doc):
         titles = []
@@ -389,49 +580,42 @@ class Imdb(HtmlScrapper):
 
         url = data["url"]
 
+        images = self.xp_cover(doc)
+        # episodes are fetched while cover is downloading
+        cover_future = self.fetch_cover(images[0] if images else None)
+
         if "alternateName" in data:
             titles.append(html.unescape(data["alternateName"]))
         titles.append(html.unescape(data["name"]))
 
-        labels = set()
+        labels = DataLabels(0)
         ended = False
 
         if data['@type'] == "Movie":
             episodes = []
-            labels.add(DataLabels.MOVIE)
+            labels |= DataLabels.MOVIE
             ended = True
         else:
             tid = self.re_tid.match(url).group(1)
             episodes = list(self.get_episodes(tid))
-            if release_year["endYear"] is not None:
-                ended = release_year["endYear"] == self._get_last_episode_year(episodes) and datetime.now().year > \
-                        release_year["endYear"]
+            end_year = release_year["endYear"]
+            # episodes are scanned only for shows which end year has already passed
+            if end_year is not None and datetime.now().year > end_year:
+                ended = end_year == self._get_last_episode_year(episodes)
 
         if ended:
-            labels.add(DataLabels.COMPLETED)
+            labels |= DataLabels.COMPLETED
 
-        genres = set(i.lower() for i in data["genre"])
+        genres = {i.lower() for i in data["genre"]}
 
         if "animation" in genres:
-            labels.add(DataLabels.CARTOON)
+            labels |= DataLabels.CARTOON
         elif data['@type'] == 'TVSeries':
-            labels.add(DataLabels.SERIES)
-
-        images = list(
-            filter(
-                None,
-                (str(i) for i in doc.xpath('//meta[@property="og:image"]/@content') if "imdb/images/logos" not in i)
-            )
-        )
-
-        if images:
-            cover = self.session.get(images[0]).content
-        else:
-            cover = None
+            labels |= DataLabels.SERIES
 
         description = ("\n".join(
             i.strip() for i in
-            doc.xpath('//span[@data-testid="plot-xl"]/text()')
+            self.xp_plot(doc)
         )).strip()
 
         return ScrappedData(
@@ -439,7 +623,7 @@ class Imdb(HtmlScrapper):
             titles=get_unique_list(titles),
             parts=episodes,
             tags=genres,
-            cover=cover,
+            cover=cover_future.result(),
             description=description,
             labels=labels
         )
@@ -460,22 +644,32 @@ class Imdb(HtmlScrapper):
                 "sha256Hash": "e5b755e1254e3bc3a36b34aff729b1d107a63263dec628a8f59935c9e778c70e", "version": 1}})
         }
 
+    def fetch_episodes_page(self, tid: str, end_cursor: str) -> typing.Optional[dict]:
+        r = self.session.get(
+            "https://caching.graphql.imdb.com/",
+            params=urllib.parse.urlencode(self.get_episodes_query(tid=tid, end_cursor=end_cursor),
+                                          quote_via=urllib.parse.quote),
+            headers={
+                **self.headers,
+                "Accept": "application/graphql+json, application/json",
+                "Content-Type": "application/json"
+            }
+        )
+        r.raise_for_status()
+
+        return json.loads(r.content)["data"]["title"]["episodes"]["episodes"]
+
     def get_more_episodes(self, tid: str, end_cursor: str):
-        while True:
-            r = self.session.get(
-                "https://caching.graphql.imdb.com/",
-                params=urllib.parse.urlencode(self.get_episodes_query(tid=tid, end_cursor=end_cursor),
-                                              quote_via=urllib.parse.quote),
-                headers={
-                    "Accept": "application/graphql+json, application/json",
-                    "Content-Type": "application/json"
-                }
-            )
-            r.raise_for_status()
+        episodes = self.fetch_episodes_page(tid, end_cursor)
+        while episodes:
+            # next page is downloaded while current one is processed
+            if episodes["pageInfo"]["hasNextPage"]:
+                next_episodes = background_executor.submit(
+                    self.fetch_episodes_page, tid, episodes["pageInfo"]["endCursor"]
+                )
+            else:
+                next_episodes = None
 
-            episodes = r.json()["data"]["title"]["episodes"]["episodes"]
-            if not episodes:
-                break
             for i in episodes["edges"]:
                 item = i["node"]
                 ep_info = item["series"]["displayableEpisodeNumber"]
@@ -489,34 +683,22 @@ class Imdb(HtmlScrapper):
                     season=ep_info["displayableSeason"]["displayableProperty"]["value"]["plainText"],
                     episode=ep_info["episodeNumber"]["displayableProperty"]["value"]["plainText"]
                 )
-            if not episodes["pageInfo"]["hasNextPage"]:
-                break
-            end_cursor = episodes["pageInfo"]["endCursor"]
+
+            episodes = None if next_episodes is None else next_episodes.result()
 
     def get_episodes(self, tid: str) -> list[List]:
-        episodes = OrderedDict()
+        episodes: dict[str, list[ListItem]] = defaultdict(list)
 
         for ep in self.iter_episodes(tid):
-            name = ep.name
-            if ep.name == f'Episode #{ep.season}.{ep.episode}':
-                name = None
-
-            if ep.season not in episodes:
-                episodes[ep.season] = []
-
             episodes[ep.season].append(
                 ListItem(
-                    name=name,
+                    name=None if ep.name == f'Episode #{ep.season}.{ep.episode}' else ep.name,
                     date=ep.date,
                     number=None if ep.episode == "Unknown" else int(ep.episode)
                 )
             )
 
-        ret = []
-        for season, eps in episodes.items():
-            ret.append(List(name=f"Season {season}", items=eps))
-
-        return ret
+        return [List(name=f"Season {season}", items=eps) for season, eps in episodes.items()]
 
     def iter_episodes(self, tid) -> typing.Iterable[ImdbEpisode]:
         self.logger.debug(f"Fetching episodes for {tid}")
@@ -544,16 +726,31 @@ class Imdb(HtmlScrapper):
 
 
 class LibraryThing(HtmlScrapper):
-    re_url = re.compile('^https?://(?:www.)?librarything.com/')
+    url_prefixes = tuple(
+        f"{scheme}://{host}/" for scheme in ("https", "http") for host in ("www.librarything.com", "librarything.com")
+    )
     re_tag_cloud = re.compile(r'ajax_work_makeworkCloud\((\d+), (\d+)\)')
     re_font_size = re.compile(r'\d(?:.\d)?')
 
+    xp_tags = XPath("//div[@class='tags tagcloud_tags']/span[@class='tag']")
+    xp_tag_name = XPath("(.//a/text())[1]", smart_strings=False)
+    xp_summary = XPath("(//tr[contains(@class, 'wslsummary')]//div[@class='showmore'])[1]")
+    xp_text = XPath("./text()", smart_strings=False)
+    xp_underlined_text = XPath("./u/text()", smart_strings=False)
+    xp_canonical_url = XPath("(/html/head/link[@rel='canonical']/@href)[1]", smart_strings=False)
+    xp_cover_srcset = XPath("(//div[@id='maincover']/img/@srcset)[1]", smart_strings=False)
+    xp_tag_js = XPath(
+        "/html/body/script[contains(text(), 'ajax_work_makeworkCloud')][1]/text()", smart_strings=False
+    )
+    xp_title = XPath("(//div[contains(@class, 'content')]//h1/text())[1]", smart_strings=False)
+    xp_author = XPath("(//div[contains(@class, 'content')]//h2/a/text())[1]", smart_strings=False)
+
     ignored_tags = {
         "own", "read", "1001", "1001 books", "ebook", "to-read", "unread"
     }
 
     def supports_url(self, url) -> bool:
-        return bool(self.re_url.match(url))
+        return url.startswith(self.url_prefixes)
 
     def fetch_tags(self, work: int, check: int):
         req = self.session.post(f"https://www.librarything.com/ajax_work_makeworkCloud.php?work={work}&check={check}")
@@ -563,9 +760,9 @@ class LibraryThing(HtmlScrapper):
     def select_tags(self, doc_tags):
         ret = {}
 
-        for tag_container in doc_tags.xpath("//div[@class='tags tagcloud_tags']/span[@class='tag']"):
+        for tag_container in self.xp_tags(doc_tags):
             tag_value = float(self.re_font_size.search(tag_container.attrib["style"]).group(0))
-            tag_name = tag_container.xpath(".//a/text()")[0].lower()
+            tag_name = self.xp_tag_name(tag_container)[0].lower()
 
             ret[tag_name] = tag_value
 
@@ -580,36 +777,39 @@ class LibraryThing(HtmlScrapper):
             yield name
 
     def get_info(self, doc: HtmlElement) -> ScrappedData:
-        x_summary = doc.xpath("//tr[contains(@class, 'wslsummary')]//div[@class='showmore']")
+        x_summary = self.xp_summary(doc)
         if x_summary:
             x_summary = x_summary[0]
-            description = "".join(filter(None, x_summary.xpath("./text()") + x_summary.xpath("./u/text()")))
+            description = "".join(filter(None, self.xp_text(x_summary) + self.xp_underlined_text(x_summary)))
         else:
             description = None
 
-        url = doc.xpath("/html/head/link[@rel='canonical']/@href")[0]
+        url = self.xp_canonical_url(doc)[0]
         work_id = int(url.split("/")[-1])
 
-        tag_js = doc.xpath("/html/body/script[contains(text(), 'ajax_work_makeworkCloud')][1]/text()")
+        # take last srcset url, it probably is the biggest
+        # also be lazy and assume that there is no x10 srcset
+        cover_url = self.xp_cover_srcset(doc)[0].split(", ")[-1][0:-3]
+        # tags are fetched while cover is downloading
+        cover_future = self.fetch_cover(cover_url)
+
+        tag_js = self.xp_tag_js(doc)
         if tag_js:
             m = self.re_tag_cloud.search(tag_js[0])
             tags = set(self.filter_tags(self.fetch_tags(m.group(1), m.group(2))))
         else:
             tags = set(self.filter_tags(self.select_tags(doc)))
 
-        # take last srcset url, it probably is the biggest
-        # also be lazy and assume that there is no x10 srcset
-        cover_url = doc.xpath("//div[@id='maincover']/img/@srcset")[0].split(", ")[-1][0:-3]
-        title = doc.xpath("//div[contains(@class, 'content')]//h1/text()")[0].strip()
-        author = doc.xpath("//div[contains(@class, 'content')]//h2/a/text()")[0].strip()
+        title = self.xp_title(doc)[0].strip()
+        author = self.xp_author(doc)[0].strip()
 
         return ScrappedData(
             description=description,
             titles=[
                 f'"{title}", {author}'
             ],
-            labels={DataLabels.BOOKS, DataLabels.COMPLETED},
-            cover=self.session.get(cover_url).content if cover_url else None,
+            labels=DataLabels.BOOKS | DataLabels.COMPLETED,
+            cover=cover_future.result(),
             parts=[],
             tags=tags,
             url=url
@@ -623,31 +823,43 @@ class NoScrapperAvailableException(Exception):
 class ScrapperGuesser:
     re_http_link = re.compile('(?P<url>' + sre_http + ')')
 
-    _scrappers = [
-        AniList(),
-        LibraryThing(),
-        Imdb()
-    ]
+    def __init__(self, session: typing.Optional[requests.Session] = None, cache: typing.Optional[PageCache] = None):
+        super(ScrapperGuesser, self).__init__()
+        session = create_session() if session is None else session
+        self._scrappers = [
+            AniList(session, cache),
+            LibraryThing(session, cache),
+            Imdb(session, cache)
+        ]
+        self._scrappers_by_url: dict[str, Scrapper] = {}
 
     def find_urls(self, card: PendingCard):
-        i = [
+        matches = itertools.chain(
             self.re_http_link.finditer(card.name),
             self.re_http_link.finditer(card.description)
-        ]
+        )
 
-        for m in itertools.chain(*i):
-            yield m.groupdict()["url"]
+        for m in matches:
+            if is_public_host(m.group("host")):
+                yield m.group("url")
 
     def get_for_url(self, url: str):
+        # keyed by whole url, scrappers match on url path too
+        if url in self._scrappers_by_url:
+            return self._scrappers_by_url[url]
+
         for scrapper in self._scrappers:
             if scrapper.supports_url(url):
+                self._scrappers_by_url[url] = scrapper
                 return scrapper
 
         raise NoScrapperAvailableException("Not supported url")
 
     def get_for_pending(self, card: PendingCard):
+        # scrapper order decides which url wins, so urls are only matched once and reused for each scrapper
+        urls = list(self.find_urls(card))
         for scrapper in self._scrappers:
-            for url in self.find_urls(card):
+            for url in urls:
                 if scrapper.supports_url(url):
                     return url, scrapper
 
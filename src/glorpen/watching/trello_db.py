@@ -1,12 +1,13 @@
 import abc
+import dataclasses
 import functools
 import io
 import itertools
 import logging
+import operator
 import re
 import typing
 
-import PIL.Image
 import more_itertools
 import requests
 from requests_oauthlib.oauth1_session import OAuth1Session
@@ -20,6 +21,7 @@ api_version = 1
 
 VERSION = "0.0.3"
 MAX_TRELLO_LIST_SIZE = 200
+MAX_TRELLO_BATCH_SIZE = 10
 
 class ApiException(Exception):
     @classmethod
@@ -130,17 +132,19 @@ class LabelBag:
 
     def by_name(self, name: typing.Union[str, DataLabels]):
         if isinstance(name, DataLabels):
-            name = name.value
+            name = name.label
         return self._by_names[name]
 
     def __iter__(self):
         return iter(self._by_id.values())
 
-    def data(self) -> set[DataLabels]:
-        return set(more_itertools.filter_except(self.by_name, DataLabels, KeyError))
+    def data(self) -> DataLabels:
+        return functools.reduce(
+            operator.or_, more_itertools.filter_except(self.by_name, DataLabels, KeyError), DataLabels(0)
+        )
 
     def tags(self) -> set[Label]:
-        data_labels = set(label.value for label in DataLabels)
+        data_labels = set(label.label for label in DataLabels)
         tags = set()
         for key, value in self._by_names.items():
             if key not in data_labels:
@@ -198,6 +202,9 @@ class DataFormatter:
 
     @classmethod
     def format_cover(cls, cover: bytes):
+        # imported lazily, it is only needed when uploading a new cover
+        import PIL.Image
+
         with PIL.Image.open(io.BytesIO(cover)) as im:
             tmp = io.BytesIO()
             im.convert('RGB').save(tmp, "JPEG")
@@ -241,7 +248,7 @@ class DataFormatter:
         return "\n".join(lines)
 
     @classmethod
-    def format_labels(cls, label_bag: LabelBag, labels: typing.Iterable[DataLabels], tags: typing.Iterable[Label]):
+    def format_labels(cls, label_bag: LabelBag, labels: DataLabels, tags: typing.Iterable[Label]):
         return set(label.id for label in itertools.chain(map(label_bag.by_name, labels), tags))
 
     @classmethod
@@ -325,15 +332,35 @@ class Database:
     def _get_api_labels(self):
         return self._session.get(f'{self._url}/boards/{self._board_id}/labels?limit=1000').json()
 
+    def _get_api_batch(self, *urls: str) -> list:
+        if len(urls) > MAX_TRELLO_BATCH_SIZE:
+            raise ValueError(f"Trello allows at most {MAX_TRELLO_BATCH_SIZE} batched requests")
+
+        ret = self._session.get(f"{self._url}/batch", params={"urls": ",".join(urls)})
+        ApiException.raise_for_status(ret)
+
+        responses = []
+        for url, response in zip(urls, ret.json()):
+            if "200" not in response:
+                raise ApiException(f"Batched request for {url} failed, got: {response}")
+            responses.append(response["200"])
+        return responses
+
     @functools.cached_property
     def cards(self):
         cards = CardBag()
         checklists = dict()
 
-        for checklist in self._session.get(f"{self._url}/boards/{self._board_id}/checklists").json():
+        # fetch both in one round trip
+        api_checklists, api_cards = self._get_api_batch(
+            f"/boards/{self._board_id}/checklists",
+            f"/boards/{self._board_id}/cards/all"
+        )
+
+        for checklist in api_checklists:
             checklists[checklist["id"]] = checklist
 
-        for card in self._get_api_cards():
+        for card in api_cards:
             try:
                 labels = LabelBag(self._labels.by_id(i) for i in card["idLabels"])
 
@@ -385,7 +412,7 @@ class Database:
                     tags=labels.tags(),
                     labels=labels.data(),
                     version=version,
-                    **vars(parsed_description)
+                    **dataclasses.asdict(parsed_description)
                 )
                 cards.add(card_model)
             except Exception as e:
@@ -461,7 +488,7 @@ class Database:
 
         for name in DataLabels:
             color = colors.get(name, "black")
-            self._ensure_trello_label(name.value, color)
+            self._ensure_trello_label(name.label, color)
 
     def _ensure_trello_label(self, name, color=None):
         try: